@@ -1,10 +1,15 @@
-import tempfile
+import hashlib
+import io
 
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 
 from contacts_matcher import (
+    contacts_version,
     init_db,
+    load_contacts_for_matching,
     load_contacts_from_csv,
     match_attendees_from_csv,
 )
@@ -25,16 +30,18 @@ st.write(
 )
 
 
-def save_uploaded_file(uploaded_file) -> str:
-    """Save uploaded CSV to a temporary file and return its path."""
-    import os
-    import tempfile as tf
+@st.cache_data(max_entries=1, show_spinner=False)
+def load_contacts_cached(version: str) -> pd.DataFrame:
+    """Contacts with match keys, reused across reruns until the DB changes."""
+    return load_contacts_for_matching()
 
-    fd, temp_path = tf.mkstemp(suffix=".csv")
-    with open(temp_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    os.close(fd)
-    return temp_path
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def matches_csv_bytes(df_hash: str, _matches_df: pd.DataFrame) -> bytes:
+    """CSV export of the matches, keyed on df_hash so reruns reuse the bytes."""
+    buf = io.BytesIO()
+    pa_csv.write_csv(pa.Table.from_pandas(_matches_df, preserve_index=False), buf)
+    return buf.getvalue()
 
 
 # --- ADMIN PANEL: Load / refresh LinkedIn contacts ---
@@ -75,10 +82,9 @@ if admin_mode:
         elif not owner_name.strip():
             st.error("Please enter the owner name.")
         else:
-            temp_path = save_uploaded_file(contacts_file)
             try:
                 load_contacts_from_csv(
-                    temp_path,
+                    io.BytesIO(contacts_file.getbuffer()),
                     owner=owner_name.strip(),
                     source=source_label.strip(),
                 )
@@ -119,9 +125,12 @@ if st.button("Compare Against Our Network", type="primary"):
     if attendees_file is None:
         st.error("Please upload a conference attendee CSV first.")
     else:
-        temp_path = save_uploaded_file(attendees_file)
         try:
-            matches_df = match_attendees_from_csv(temp_path, threshold=int(threshold))
+            matches_df = match_attendees_from_csv(
+                io.BytesIO(attendees_file.getbuffer()),
+                threshold=int(threshold),
+                contacts_df=load_contacts_cached(contacts_version()),
+            )
 
             if matches_df.empty:
                 st.warning(
@@ -131,11 +140,6 @@ if st.button("Compare Against Our Network", type="primary"):
             else:
                 st.subheader("Matches Found")
 
-                # Optionally hide score if user doesn't care
-                display_df = matches_df.copy()
-                if not show_scores and "match_score" in display_df.columns:
-                    display_df = display_df.drop(columns=["match_score"])
-
                 # Reorder to focus on attendee + contact name & company
                 preferred_cols = [
                     "attendee_name",
@@ -147,15 +151,23 @@ if st.button("Compare Against Our Network", type="primary"):
                     "contact_email",
                     "match_score",
                 ]
-                cols = [c for c in preferred_cols if c in display_df.columns] + [
-                    c for c in display_df.columns if c not in preferred_cols
+                cols = [c for c in preferred_cols if c in matches_df.columns] + [
+                    c for c in matches_df.columns if c not in preferred_cols
                 ]
-                display_df = display_df[cols]
+                # Optionally hide score if user doesn't care
+                if not show_scores:
+                    cols = [c for c in cols if c != "match_score"]
+
+                # Single column projection; no upfront copy of every column
+                display_df = matches_df[cols]
 
                 st.dataframe(display_df, use_container_width=True)
 
                 # Download button for matches
-                csv_bytes = matches_df.to_csv(index=False).encode("utf-8")
+                # Hash the ordered row hashes so a reordered result gets a new key
+                row_hashes = pd.util.hash_pandas_object(matches_df, index=False)
+                df_hash = hashlib.sha1(row_hashes.to_numpy().tobytes()).hexdigest()
+                csv_bytes = matches_csv_bytes(df_hash, matches_df)
                 st.download_button(
                     label="Download matches as CSV",
                     data=csv_bytes,
@@ -1,18 +1,66 @@
 import argparse
+import os
 import sqlite3
+import tempfile
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from rapidfuzz import fuzz, process
+
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:  # locked-down hosts: score with the numba port instead
+    fuzz = process = None
+    try:
+        import match_numba
+    except ImportError as exc:
+        raise ImportError(
+            "Fuzzy matching needs rapidfuzz: install rapidfuzz, "
+            "or numba for the fallback scorer."
+        ) from exc
 
 DB_PATH = "network.db"
 
+# Read-only column mirror of the contacts table for the matcher. SQLite stays
+# the source of truth; the snapshot is rewritten after every contacts load and
+# tagged with the contacts_db_token() it was read at.
+SNAPSHOT_PATH = "contacts.parquet"
+SNAPSHOT_COLUMNS = ["full_name", "company", "title", "email", "owner", "source"]
+
+# Attendee rows scored per cdist call; bounds the float32 score matrix to
+# 4 x CDIST_CHUNK_ROWS x len(contacts) bytes.
+CDIST_CHUNK_ROWS = 250
+
+# Keys are normalized and token-sorted before scoring, so plain ratio gives
+# token_sort_ratio's result without re-sorting every pair, and runs with
+# processor=None. It honours score_cutoff and uses rapidfuzz's bit-parallel
+# (SIMD across choices) Indel kernel, letting it skip hopeless pairs early.
+MATCH_SCORER = fuzz.ratio if fuzz is not None else None
+
+# Match result columns, mapped to the attendee/contact column they come from
+ATTENDEE_MATCH_COLUMNS = {
+    "attendee_name": "attendee_name",
+    "attendee_company": "attendee_company",
+    "attendee_email": "attendee_email",
+}
+CONTACT_MATCH_COLUMNS = {
+    "contact_name": "full_name",
+    "contact_company": "company",
+    "contact_title": "title",
+    "contact_owner": "owner",
+    "contact_source": "source",
+    "contact_email": "email",
+}
+
 
 # ---------- DB UTILITIES ----------
 
 def get_conn():
     conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
     return conn
 
 
@@ -37,6 +85,10 @@ def init_db():
         );
         """
     )
+    # Refreshes delete by (owner, source); avoid a full table scan
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS ix_contacts_owner_source ON contacts(owner, source)"
+    )
 
     conn.commit()
     conn.close()
@@ -44,30 +96,64 @@ def init_db():
 
 # ---------- HELPERS ----------
 
-def normalize_string(s: str) -> str:
-    if s is None:
-        return ""
-    return " ".join(str(s).strip().lower().split())
+def normalize_series(s: pd.Series) -> pd.Series:
+    """
+    Lowercase, trim and collapse any Unicode whitespace (NBSP included) to
+    single spaces, for a whole column at once.
+
+    Columns like company repeat the same few values many times, so only the
+    distinct values are normalized and the results are scattered back.
+    """
+    codes, uniques = pd.factorize(s.fillna("").astype(str))
+    normalized = (
+        pd.Series(uniques)
+        .str.lower()
+        .str.split()
+        .str.join(" ")
+    )
+    return normalized.take(codes).set_axis(s.index)
+
+
+def name_blocks(names: pd.Series) -> pd.Series:
+    """Blocking key for fuzzy matching: first two letters of the last name."""
+    last_names = normalize_series(names).str.split().str[-1].fillna("")
+    return last_names.str[:2]
+
+
+def is_path(csv_source) -> bool:
+    """True for filesystem paths, False for in-memory file-like objects."""
+    return isinstance(csv_source, (str, os.PathLike))
+
 
+def read_csv(csv_source) -> pd.DataFrame:
+    """
+    Parse a CSV (path or file-like object) with Arrow's multithreaded reader.
+    Every column is kept as an Arrow-backed string, since all fields are
+    treated as text downstream.
+    """
+    return pd.read_csv(csv_source, engine="pyarrow", dtype="string[pyarrow]")
 
-def split_name(full_name: str):
-    """Very basic splitter: last word is last name, rest is first name."""
-    if not full_name:
-        return "", ""
-    parts = full_name.strip().split()
-    if len(parts) == 1:
-        return parts[0], ""
-    first = " ".join(parts[:-1])
-    last = parts[-1]
-    return first, last
+
+def split_names(full_names: pd.Series):
+    """
+    Very basic splitter: last word is last name, rest is first name.
+    Splits the whole column in one pass; returns (first_names, last_names).
+    """
+    parts = full_names.str.strip().str.rsplit(n=1, expand=True)
+    if parts.shape[1] < 2:
+        # No name in the column has a space, so rsplit produced one column
+        return full_names.str.strip(), pd.Series("", index=full_names.index)
+    return parts[0].fillna(""), parts[1].fillna("")
 
 
 # ---------- CONTACTS LOADING / UPDATING ----------
 
-def load_contacts_from_csv(csv_path: str, owner: str, source: str):
+def load_contacts_from_csv(csv_source, owner: str, source: str):
     """
     Load or refresh LinkedIn contacts for a given owner+source.
 
+    csv_source is a path or a file-like object (e.g. an uploaded file's bytes).
+
     Behavior:
         - First deletes any existing contacts with this (owner, source).
         - Then inserts rows from the CSV.
@@ -79,11 +165,10 @@ def load_contacts_from_csv(csv_path: str, owner: str, source: str):
         - email or Email
         - linkedin_url or URL / LinkedIn URL
     """
-    path = Path(csv_path)
-    if not path.exists():
-        raise FileNotFoundError(f"CSV not found: {csv_path}")
+    if is_path(csv_source) and not Path(csv_source).exists():
+        raise FileNotFoundError(f"CSV not found: {csv_source}")
 
-    df = pd.read_csv(path)
+    df = read_csv(csv_source)
 
     # Try to detect columns
     col_map = {}
@@ -122,102 +207,289 @@ def load_contacts_from_csv(csv_path: str, owner: str, source: str):
         )
         col_map["full_name"] = "__full_name_tmp"
 
+    def _column(key):
+        if key not in col_map:
+            return pd.Series("", index=df.index)
+        return df[col_map[key]].fillna("").astype(str).str.strip()
+
+    out = pd.DataFrame(
+        {
+            "full_name": _column("full_name"),
+            "company": _column("company"),
+            "title": _column("title"),
+            "email": _column("email"),
+            "linkedin_url": _column("linkedin_url"),
+            "source": source,
+            "owner": owner,
+        }
+    )
+    out = out[out["full_name"] != ""]
+    first_names, last_names = split_names(out["full_name"])
+    out.insert(1, "first_name", first_names)
+    out.insert(2, "last_name", last_names)
+
+    # One bulk conversion to rows of plain Python str for sqlite3 to bind
+    records = out.to_numpy(dtype=object).tolist()
+
     conn = get_conn()
     cur = conn.cursor()
 
-    # Delete existing contacts for this owner+source (update behavior)
-    cur.execute(
-        "DELETE FROM contacts WHERE owner = ? AND source = ?",
-        (owner, source),
-    )
-    deleted = cur.rowcount or 0
-
-    inserted = 0
-    for _, row in df.iterrows():
-        full_name_raw = str(row[col_map["full_name"]]).strip()
-        if not full_name_raw:
-            continue
+    with conn:
+        # Take the write lock up front so the refresh can't deadlock midway
+        cur.execute("BEGIN IMMEDIATE")
 
-        company = str(row[col_map.get("company", "")]) if "company" in col_map else ""
-        title = str(row[col_map.get("title", "")]) if "title" in col_map else ""
-        email = str(row[col_map.get("email", "")]) if "email" in col_map else ""
-        linkedin_url = (
-            str(row[col_map.get("linkedin_url", "")])
-            if "linkedin_url" in col_map
-            else ""
+        # Delete existing contacts for this owner+source (update behavior)
+        cur.execute(
+            "DELETE FROM contacts WHERE owner = ? AND source = ?",
+            (owner, source),
         )
+        deleted = cur.rowcount or 0
 
-        first_name, last_name = split_name(full_name_raw)
+        # Bump the refresh counter in contacts_db_token(); ids get reused when
+        # the same rows are deleted and reinserted
+        (refreshes,) = cur.execute("PRAGMA user_version").fetchone()
+        cur.execute(f"PRAGMA user_version = {refreshes + 1}")
 
-        cur.execute(
+        cur.executemany(
             """
             INSERT INTO contacts (
                 full_name, first_name, last_name, company, title, email, linkedin_url, source, owner
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (
-                full_name_raw,
-                first_name,
-                last_name,
-                company,
-                title,
-                email,
-                linkedin_url,
-                source,
-                owner,
-            ),
+            records,
         )
-        inserted += 1
+        inserted = len(out)
 
-    conn.commit()
+    write_contacts_snapshot(conn)
     conn.close()
+    origin = csv_source if is_path(csv_source) else "upload"
     print(
         f"Refreshed contacts for owner='{owner}', source='{source}'. "
-        f"Deleted {deleted} old rows, inserted {inserted} new contacts from {csv_path}."
+        f"Deleted {deleted} old rows, inserted {inserted} new contacts from {origin}."
     )
 
 
 # ---------- MATCHING: CONTACTS vs EPHEMERAL CONFERENCE CSV ----------
 
-def build_contact_key(row):
-    name = normalize_string(row["full_name"])
-    company = normalize_string(row["company"])
-    return f"{name} | {company}".strip(" |")
+def build_match_keys(names: pd.Series, companies: pd.Series) -> pd.Series:
+    """
+    Build 'name | company' keys for a whole column at once, with tokens
+    pre-sorted so scoring can use plain fuzz.ratio (see MATCH_SCORER).
 
+    Tokens are sorted once per distinct key and scattered back, like
+    normalize_series.
+    """
+    keys = normalize_series(names) + " | " + normalize_series(companies)
+    codes, uniques = pd.factorize(keys.str.strip(" |"))
+    sorted_keys = pd.Series(
+        [" ".join(sorted(key.split())) for key in uniques],
+        dtype=keys.dtype,
+    )
+    return sorted_keys.take(codes).set_axis(keys.index)
 
-def build_attendee_key(row):
-    name = normalize_string(row["attendee_name"])
-    company = normalize_string(row["attendee_company"])
-    return f"{name} | {company}".strip(" |")
+
+def exact_matches(queries, choices) -> np.ndarray:
+    """
+    Position of the first choice equal to each query, or -1 when there is none.
+    """
+    choices = pd.Series(choices)
+    first = choices[~choices.duplicated()]
+    pos = pd.Index(first.to_numpy()).get_indexer(queries)
+    return np.where(pos >= 0, first.index.to_numpy()[pos], -1)
 
 
-def match_attendees_from_csv(csv_path: str, threshold: int = 85) -> pd.DataFrame:
+def best_matches(queries, choices, threshold: int, workers: int = -1):
     """
-    Compare an attendee CSV (conference list) against the contacts database.
+    Score every query against every choice and return, per query, the index
+    of the best-scoring choice and its score (0 when nothing reaches threshold).
+    Scores stay float32 so near-ties (93.02 vs 93.33) pick the higher one.
 
-    DOES NOT store anything about the attendees. All in-memory + returns a DataFrame.
+    workers is passed to rapidfuzz: -1 uses every core, 1 stays single-threaded.
+    Without rapidfuzz installed, scoring falls back to match_numba.
+    """
+    if process is None:
+        return match_numba.best_matches(queries, choices, threshold, workers)
+
+    best_idx = np.zeros(len(queries), dtype=np.intp)
+    best_score = np.zeros(len(queries), dtype=np.float32)
+
+    for start in range(0, len(queries), CDIST_CHUNK_ROWS):
+        chunk = queries[start:start + CDIST_CHUNK_ROWS]
+        scores = process.cdist(
+            chunk,
+            choices,
+            scorer=MATCH_SCORER,
+            processor=None,
+            score_cutoff=threshold,
+            dtype=np.float32,
+            workers=workers,
+        )
+        idx = scores.argmax(axis=1)
+        best_idx[start:start + len(chunk)] = idx
+        best_score[start:start + len(chunk)] = scores[np.arange(len(chunk)), idx]
 
-    Expected attendee columns (flexible):
-        - name or full name
-        - company or organization/org
-        - email or email address (optional)
+    return best_idx, best_score
+
+
+def blocked_best_matches(
+    queries, query_blocks, choices, choice_blocks, threshold: int, workers: int = -1
+):
+    """
+    Like best_matches, but each query is only scored against choices sharing
+    its block. Queries with an empty or unknown block fall back to all choices.
+    """
+    queries = np.asarray(queries, dtype=object)
+    choices = np.asarray(choices, dtype=object)
+    best_idx = np.zeros(len(queries), dtype=np.intp)
+    best_score = np.zeros(len(queries), dtype=np.float32)
+
+    choice_blocks = pd.Series(choice_blocks)
+    buckets = choice_blocks.groupby(choice_blocks.to_numpy()).indices
+    query_blocks = pd.Series(query_blocks)
+    fallback = []
+
+    for block, q_pos in query_blocks.groupby(query_blocks.to_numpy()).indices.items():
+        c_pos = buckets.get(block) if block else None
+        if c_pos is None:
+            fallback.append(q_pos)
+            continue
+        idx, score = best_matches(queries[q_pos], choices[c_pos], threshold, workers)
+        best_idx[q_pos] = c_pos[idx]
+        best_score[q_pos] = score
+
+    if fallback:
+        q_pos = np.concatenate(fallback)
+        idx, score = best_matches(queries[q_pos], choices, threshold, workers)
+        best_idx[q_pos] = idx
+        best_score[q_pos] = score
+
+    return best_idx, best_score
+
+
+def contacts_version() -> str:
+    """
+    Cheap token that changes whenever the contacts database is written.
+
+    Covers the WAL file too, since writes land there until a checkpoint.
+    """
+    parts = []
+    for path in (DB_PATH, f"{DB_PATH}-wal"):
+        if os.path.exists(path):
+            parts.append((os.path.getmtime(path), os.path.getsize(path)))
+    return str(parts)
+
+
+def contacts_db_token(conn) -> str:
+    """
+    Identifies the contents of the contacts table: refresh counter, row count
+    and highest id. Call inside the transaction that reads the rows.
+    """
+    (refreshes,) = conn.execute("PRAGMA user_version").fetchone()
+    rows, max_id = conn.execute("SELECT COUNT(*), MAX(id) FROM contacts").fetchone()
+    return f"{refreshes}:{rows}:{max_id}"
+
+
+def write_contacts_snapshot(conn):
+    """
+    Mirror the matcher's contact columns from SQLite into SNAPSHOT_PATH,
+    tagged with the contacts_db_token() of the rows it holds.
+    """
+    conn.execute("BEGIN")  # one read snapshot for the token and the rows
+    try:
+        token = contacts_db_token(conn)
+        contacts_df = pd.read_sql_query(
+            f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM contacts", conn
+        )
+    finally:
+        conn.rollback()
+    contacts_df.attrs["contacts_db_token"] = token
+
+    # A private temp file per writer, so concurrent rebuilds can't interleave
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(SNAPSHOT_PATH)),
+        prefix=f"{os.path.basename(SNAPSHOT_PATH)}.",
+        suffix=".tmp",
+    )
+    os.close(fd)
+    try:
+        contacts_df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, SNAPSHOT_PATH)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return contacts_df
+
+
+def read_fresh_snapshot(conn):
+    """
+    The Parquet snapshot if it matches the database's current
+    contacts_db_token(), else None.
     """
-    path = Path(csv_path)
-    if not path.exists():
-        raise FileNotFoundError(f"Attendee CSV not found: {csv_path}")
+    if not os.path.exists(SNAPSHOT_PATH):
+        return None
+    try:
+        contacts_df = pd.read_parquet(SNAPSHOT_PATH, columns=SNAPSHOT_COLUMNS)
+    except FileNotFoundError:  # replaced or removed by another writer meanwhile
+        return None
+    if contacts_df.attrs.get("contacts_db_token") != contacts_db_token(conn):
+        return None
+    return contacts_df
+
+
+def load_contacts_for_matching() -> pd.DataFrame:
+    """
+    Read all contacts and precompute the columns the matcher needs
+    (match_key and match_block). Safe to cache until contacts_version() changes.
 
-    # Load contacts
+    Reads the Parquet snapshot (column-major, only the needed columns) and
+    rebuilds it from SQLite when it is missing or its token no longer matches
+    the database.
+    """
     conn = get_conn()
-    contacts_df = pd.read_sql_query("SELECT * FROM contacts", conn)
+    contacts_df = read_fresh_snapshot(conn)
+    if contacts_df is None:
+        contacts_df = write_contacts_snapshot(conn)
     conn.close()
 
     if contacts_df.empty:
         raise ValueError("No contacts in database. Load contacts first.")
 
-    contacts_df["match_key"] = contacts_df.apply(build_contact_key, axis=1)
+    contacts_df["match_key"] = build_match_keys(
+        contacts_df["full_name"], contacts_df["company"]
+    )
+    contacts_df["match_block"] = name_blocks(contacts_df["full_name"])
+    return contacts_df
+
+
+def match_attendees_from_csv(
+    csv_source,
+    threshold: int = 85,
+    contacts_df: pd.DataFrame = None,
+    workers: int = -1,
+) -> pd.DataFrame:
+    """
+    Compare an attendee CSV (conference list) against the contacts database.
+
+    DOES NOT store anything about the attendees. All in-memory + returns a DataFrame.
+    csv_source is a path or a file-like object, so uploads never touch disk.
+
+    Pass contacts_df (from load_contacts_for_matching) to reuse already
+    prepared contacts; otherwise they are read from the database.
+    workers caps the CPU cores used for fuzzy scoring (-1 = all cores).
+
+    Expected attendee columns (flexible):
+        - name or full name
+        - company or organization/org
+        - email or email address (optional)
+    """
+    if is_path(csv_source) and not Path(csv_source).exists():
+        raise FileNotFoundError(f"Attendee CSV not found: {csv_source}")
+
+    if contacts_df is None:
+        contacts_df = load_contacts_for_matching()
 
     # Load attendees CSV
-    raw_df = pd.read_csv(path)
+    raw_df = read_csv(csv_source)
 
     # Map columns
     col_map = {}
@@ -234,65 +506,63 @@ def match_attendees_from_csv(csv_path: str, threshold: int = 85) -> pd.DataFrame
         raise ValueError("Could not find a 'name' or 'full name' column in attendee CSV.")
 
     attendees_df = pd.DataFrame()
-    attendees_df["attendee_name"] = raw_df[col_map["name"]].astype(str).fillna("").str.strip()
+    attendees_df["attendee_name"] = raw_df[col_map["name"]].fillna("").astype(str).str.strip()
     attendees_df["attendee_company"] = (
-        raw_df[col_map["company"]].astype(str).fillna("").str.strip()
+        raw_df[col_map["company"]].fillna("").astype(str).str.strip()
         if "company" in col_map
         else ""
     )
     attendees_df["attendee_email"] = (
-        raw_df[col_map["email"]].astype(str).fillna("").str.strip()
+        raw_df[col_map["email"]].fillna("").astype(str).str.strip()
         if "email" in col_map
         else ""
     )
 
-    attendees_df["match_key"] = attendees_df.apply(build_attendee_key, axis=1)
-
-    # Prep for fuzzy match
-    contact_keys = contacts_df["match_key"].tolist()
-    # map key -> index in contacts_df
-    key_to_index = {row["match_key"]: idx for idx, row in contacts_df.iterrows()}
-
-    matches_export = []
-
-    for _, att in attendees_df.iterrows():
-        query_key = att["match_key"]
-        if not query_key:
-            continue
-
-        best_match = process.extractOne(
-            query_key,
-            contact_keys,
-            scorer=fuzz.token_sort_ratio,
-        )
-
-        if best_match is None:
-            continue
+    attendees_df["match_key"] = build_match_keys(
+        attendees_df["attendee_name"], attendees_df["attendee_company"]
+    )
 
-        best_key, score, _ = best_match
+    attendee_keys = attendees_df["match_key"].to_numpy()
+    contact_keys = contacts_df["match_key"].to_numpy()
+
+    # Score each distinct (key, block) once; repeated attendee rows share it
+    codes, uniques = pd.MultiIndex.from_arrays(
+        [attendee_keys, name_blocks(attendees_df["attendee_name"]).to_numpy()]
+    ).factorize()
+    unique_keys = uniques.get_level_values(0).to_numpy()
+    unique_blocks = uniques.get_level_values(1).to_numpy()
+
+    # Round 0: exact key hits are a perfect score, no fuzzy scoring needed
+    best_idx = exact_matches(unique_keys, contact_keys)
+    best_score = np.where(best_idx >= 0, 100, 0).astype(np.float32)
+
+    # Round 1: score the rest only against contacts in the same last-name block
+    fuzzy = best_idx < 0
+    best_idx[fuzzy], best_score[fuzzy] = blocked_best_matches(
+        unique_keys[fuzzy],
+        unique_blocks[fuzzy],
+        contact_keys,
+        contacts_df["match_block"].to_numpy(),
+        threshold,
+        workers,
+    )
+    best_idx, best_score = best_idx[codes], best_score[codes]
 
-        if score < threshold:
-            continue
+    mask = (best_score >= threshold) & (attendee_keys != "")
+    hit_rows = np.flatnonzero(mask)
+    hit_contacts = best_idx[mask]
 
-        contact_idx = key_to_index[best_key]
-        contact_row = contacts_df.iloc[contact_idx]
-
-        matches_export.append(
-            {
-                "attendee_name": att["attendee_name"],
-                "attendee_company": att["attendee_company"],
-                "attendee_email": att["attendee_email"],
-                "contact_name": contact_row["full_name"],
-                "contact_company": contact_row["company"],
-                "contact_title": contact_row["title"],
-                "contact_owner": contact_row["owner"],
-                "contact_source": contact_row["source"],
-                "contact_email": contact_row["email"],
-                "match_score": score,
-            }
-        )
+    # Gather only the hit rows, keeping each column's own (string) dtype
+    out = {}
+    for frame, columns, rows in (
+        (attendees_df, ATTENDEE_MATCH_COLUMNS, hit_rows),
+        (contacts_df, CONTACT_MATCH_COLUMNS, hit_contacts),
+    ):
+        for out_col, src_col in columns.items():
+            out[out_col] = frame[src_col].array.take(rows)
+    out["match_score"] = best_score[mask].astype(np.float64).round(2)
 
-    return pd.DataFrame(matches_export)
+    return pd.DataFrame(out)
 
 
 # ---------- CLI (optional, still works) ----------
@@ -336,6 +606,12 @@ def main():
         default="matches.csv",
         help="Output CSV file for matches (default: matches.csv).",
     )
+    sp_match.add_argument(
+        "--workers",
+        type=int,
+        default=-1,
+        help="CPU cores used for fuzzy scoring (-1 = all cores). Default: -1.",
+    )
 
     args = parser.parse_args()
 
@@ -349,7 +625,9 @@ def main():
 
     elif args.command == "match-csv":
         init_db()
-        df_matches = match_attendees_from_csv(args.csv, threshold=args.threshold)
+        df_matches = match_attendees_from_csv(
+            args.csv, threshold=args.threshold, workers=args.workers
+        )
         if df_matches.empty:
             print("No matches found above threshold.")
         else:
@@ -0,0 +1,178 @@
+"""
+Numba fallback for fuzzy matching on hosts where rapidfuzz isn't available.
+
+Mirrors contacts_matcher.best_matches with MATCH_SCORER (fuzz.ratio on
+token-sorted keys): the normalized Indel similarity
+100 * (1 - (len(a) + len(b) - 2 * LCS) / (len(a) + len(b))), kept as float32
+like the cdist scores so ties resolve the same way. LCS is computed
+bit-parallel (Hyyro's variant of Myers' algorithm), one uint64 word per 64
+query characters.
+"""
+import numpy as np
+from numba import config, get_num_threads, njit, prange, set_num_threads
+
+_ONE = np.uint64(1)
+_ALL_ONES = ~np.uint64(0)
+
+# Text characters between checks of the LCS upper bound in _lcs
+_BOUND_STRIDE = 8
+
+
+# ---------- ENCODING ----------
+
+def _encode(strings, alphabet):
+    """Pack strings into a padded matrix of dense alphabet ids."""
+    lengths = np.array([len(s) for s in strings], dtype=np.int64)
+    width = max(int(lengths.max(initial=0)), 1)
+    codes = np.zeros((len(strings), width), dtype=np.int32)
+    for i, s in enumerate(strings):
+        points = np.frombuffer(s.encode("utf-32-le"), dtype=np.int32)
+        codes[i, : len(s)] = np.searchsorted(alphabet, points)
+    return codes, lengths
+
+
+def _alphabet(*string_lists):
+    """Sorted array of every code point used across the given strings."""
+    seen = set()
+    for strings in string_lists:
+        for s in strings:
+            seen.update(s)
+    return np.array(sorted(ord(ch) for ch in seen), dtype=np.int32)
+
+
+# ---------- SCORING KERNELS ----------
+
+@njit(cache=True)
+def _popcount(x):
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    pairs = np.uint64(0x3333333333333333)
+    x = (x & pairs) + ((x >> np.uint64(2)) & pairs)
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+@njit(cache=True)
+def _score(lcs, total):
+    """Same arithmetic as rapidfuzz's Indel normalized similarity, x100."""
+    return (1.0 - (total - 2 * lcs) / total) * 100.0
+
+
+@njit(cache=True)
+def _build_peq(pattern, length, alphabet_size, words):
+    """Peq[c] = bitmask of the positions where the pattern holds character c."""
+    peq = np.zeros((alphabet_size, words), dtype=np.uint64)
+    for k in range(length):
+        peq[pattern[k], k // 64] |= _ONE << np.uint64(k % 64)
+    return peq
+
+
+@njit(cache=True)
+def _count_zeros(v, length):
+    """Zero bits among the first `length` bits of v, i.e. the current LCS."""
+    words = v.shape[0]
+    count = 0
+    for w in range(words):
+        zeros = ~v[w]
+        if w == words - 1 and length % 64:
+            zeros &= (_ONE << np.uint64(length % 64)) - _ONE
+        count += _popcount(zeros)
+    return count
+
+
+@njit(cache=True)
+def _lcs(peq, length, text, text_len, v, min_lcs):
+    """
+    LCS of the pattern behind peq and text. Each text character updates every
+    pattern position at once: V' = (V + (V & M)) | (V & ~M), carried across
+    words; the LCS is the number of zero bits left in V.
+
+    Each text character adds at most one to the LCS, so once the remaining
+    characters can't reach min_lcs the scan stops and returns the (too small)
+    partial LCS. Checked every _BOUND_STRIDE characters.
+    """
+    words = v.shape[0]
+    v[:] = _ALL_ONES
+    for t in range(text_len):
+        if t % _BOUND_STRIDE == 0 and t > 0:
+            lcs = _count_zeros(v, length)
+            if lcs + (text_len - t) < min_lcs:
+                return lcs
+        carry = np.uint64(0)
+        for w in range(words):
+            old = v[w]
+            u = old & peq[text[t], w]
+            x = old + carry
+            overflow = x < carry
+            x = x + u
+            overflow = overflow or x < u
+            v[w] = x | (old & ~u)
+            carry = _ONE if overflow else np.uint64(0)
+
+    return _count_zeros(v, length)
+
+
+@njit(parallel=True, cache=True)
+def _match_all(
+    q_codes, q_lens, c_codes, c_lens, alphabet_size, threshold, best_idx, best_score
+):
+    for i in prange(q_codes.shape[0]):
+        words = max((q_lens[i] + 63) // 64, 1)
+        peq = _build_peq(q_codes[i], q_lens[i], alphabet_size, words)
+        v = np.empty(words, dtype=np.uint64)
+        top_score = np.float32(0.0)
+        top_idx = 0
+        for j in range(c_codes.shape[0]):
+            total = q_lens[i] + c_lens[j]
+            if total == 0:
+                score = 100.0
+            else:
+                # Only a score above the best so far can win
+                cutoff = max(float(threshold), float(top_score))
+                # The LCS can't exceed the shorter string
+                if _score(min(q_lens[i], c_lens[j]), total) < cutoff:
+                    continue
+                min_lcs = int(cutoff * total / 200.0)
+                lcs = _lcs(peq, q_lens[i], c_codes[j], c_lens[j], v, min_lcs)
+                score = _score(lcs, total)
+            if score < threshold:
+                continue
+            if np.float32(score) > top_score:
+                top_score = np.float32(score)
+                top_idx = j
+        best_idx[i] = top_idx
+        best_score[i] = top_score
+
+
+# ---------- PUBLIC API ----------
+
+def best_matches(queries, choices, threshold: int, workers: int = -1):
+    """
+    Same contract as contacts_matcher.best_matches: per query, the index of the
+    best-scoring choice and its score (0 when nothing reaches threshold).
+    """
+    queries = [str(q) for q in queries]
+    choices = [str(c) for c in choices]
+    alphabet = _alphabet(queries, choices)
+    q_codes, q_lens = _encode(queries, alphabet)
+    c_codes, c_lens = _encode(choices, alphabet)
+    best_idx = np.zeros(len(q_lens), dtype=np.intp)
+    best_score = np.zeros(len(q_lens), dtype=np.float32)
+
+    previous = get_num_threads()
+    if workers > 0:
+        set_num_threads(min(workers, config.NUMBA_NUM_THREADS))
+    try:
+        _match_all(
+            q_codes,
+            q_lens,
+            c_codes,
+            c_lens,
+            len(alphabet),
+            threshold,
+            best_idx,
+            best_score,
+        )
+    finally:
+        set_num_threads(previous)
+
+    return best_idx, best_score
@@ -0,0 +1,84 @@
+"""
+The numba fallback must pick the same contact with the same score as the
+rapidfuzz path (cdist with fuzz.ratio, float32 scores, score_cutoff).
+"""
+import random
+
+import numpy as np
+import pytest
+
+pytest.importorskip("numba")
+fuzz = pytest.importorskip("rapidfuzz.fuzz")
+process = pytest.importorskip("rapidfuzz.process")
+
+import match_numba  # noqa: E402
+
+
+def cdist_best(queries, choices, threshold):
+    scores = process.cdist(
+        queries,
+        choices,
+        scorer=fuzz.ratio,
+        processor=None,
+        score_cutoff=threshold,
+        dtype=np.float32,
+    )
+    idx = scores.argmax(axis=1)
+    return idx, scores[np.arange(len(queries)), idx]
+
+
+def random_strings(rng, alphabet, max_len, n):
+    return [
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_len)))
+        for _ in range(n)
+    ]
+
+
+@pytest.mark.parametrize(
+    "alphabet, max_len",
+    [
+        ("abc", 8),  # many exact ties and scores landing on the threshold
+        ("ab ", 30),
+        ("abcdefghijklmnop |", 90),  # keys spanning two 64-bit words
+        ("abcdeéü ñ|xyz", 200),  # non-ASCII, up to four words
+    ],
+)
+@pytest.mark.parametrize("threshold", [0, 50, 57, 58, 75, 85, 100])
+def test_matches_rapidfuzz(alphabet, max_len, threshold):
+    rng = random.Random(f"{alphabet}-{threshold}")
+    queries = random_strings(rng, alphabet, max_len, 120)
+    choices = random_strings(rng, alphabet, max_len, 200)
+
+    expected_idx, expected_score = cdist_best(queries, choices, threshold)
+    best_idx, best_score = match_numba.best_matches(queries, choices, threshold)
+
+    np.testing.assert_array_equal(best_score, expected_score)
+    np.testing.assert_array_equal(best_idx, expected_idx)
+
+
+def test_score_exactly_at_threshold_is_kept():
+    # "abcd" vs "abce": LCS 3 of 8 characters -> exactly 75.0
+    _, kept = match_numba.best_matches(["abcd"], ["abce"], 75)
+    _, cut = match_numba.best_matches(["abcd"], ["abce"], 76)
+    assert kept[0] == 75.0
+    assert cut[0] == 0.0
+
+
+def test_near_tie_picks_higher_score():
+    # Token-sorted keys: 93.02 vs 93.33, which both round to 93
+    queries = ["josé smlthe umbrella |"]
+    choices = ["josé smith umbrella |", "josé smither umbrella |"]
+    best_idx, best_score = match_numba.best_matches(queries, choices, 85)
+    expected_idx, expected_score = cdist_best(queries, choices, 85)
+    assert best_idx[0] == expected_idx[0] == 1
+    assert best_score[0] == expected_score[0]
+
+
+def test_workers_do_not_change_results():
+    rng = random.Random(7)
+    queries = random_strings(rng, "abcdefgh ", 40, 60)
+    choices = random_strings(rng, "abcdefgh ", 40, 80)
+    all_cores = match_numba.best_matches(queries, choices, 60)
+    one_core = match_numba.best_matches(queries, choices, 60, workers=1)
+    np.testing.assert_array_equal(all_cores[0], one_core[0])
+    np.testing.assert_array_equal(all_cores[1], one_core[1])